@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize_message(text: str) -> str:
+    """Cache key for a chat message: lowercased with whitespace collapsed"""
+    return " ".join(text.lower().split())
+
+
+class TTLLRUCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed TTL"""
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (stored_at, value), least recently used first
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if time.monotonic() - stored_at <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+            }
+
+
+class SemanticReplyCache:
+    """Serve a stored reply when a new message is a close paraphrase of a cached one
+
+    Unit-length embeddings are sharded with random-projection LSH: the sign of
+    the projection onto each hyperplane gives one bit of the bucket id. A
+    lookup only scores the message's own bucket and the buckets one bit away,
+    since a near-duplicate can still fall on the other side of a hyperplane.
+
+    Buckets are also split by an optional scope string: a lookup never
+    matches an entry stored under a different scope.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Sequence[float]],
+        dim: int = 384,
+        threshold: float = 0.95,
+        n_planes: int = 8,
+        maxsize: int = 2048,
+        ttl: float = 3600,
+        seed: int = 0,
+    ):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._embed_fn = embed
+        self._embed = lru_cache(maxsize=256)(self._embed_uncached)
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((n_planes, dim)).astype(np.float32)
+        self._bit_values = 1 << np.arange(n_planes)
+        self._probe_masks = [0] + [1 << bit for bit in range(n_planes)]
+        # key -> ((scope, bucket), vector, reply, stored_at), oldest first
+        self._entries: Dict[str, Tuple[Tuple[Optional[str], int], np.ndarray, str, float]] = {}
+        # (scope, bucket) -> (keys, matrix whose row i is the vector of keys[i])
+        self._buckets: Dict[Tuple[Optional[str], int], Tuple[List[str], np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _embed_uncached(self, text: str) -> np.ndarray:
+        vector = np.array(self._embed_fn(text), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        vector.setflags(write=False)
+        return vector
+
+    def _bucket(self, vector: np.ndarray) -> int:
+        return int(self._bit_values[(self._planes @ vector) > 0].sum())
+
+    def get(self, key: str, scope: Optional[str] = None) -> Optional[str]:
+        """Return the reply of the most similar cached message in the scope above the threshold"""
+        vector = self._embed(key)
+        bucket = self._bucket(vector)
+        best_sim, best_key = -1.0, None
+        with self._lock:
+            for mask in self._probe_masks:
+                shard = self._buckets.get((scope, bucket ^ mask))
+                if shard is None:
+                    continue
+                keys, matrix = shard
+                sims = matrix @ vector
+                i = int(np.argmax(sims))
+                if sims[i] > best_sim:
+                    best_sim, best_key = float(sims[i]), keys[i]
+            if best_key is not None and best_sim > self.threshold:
+                _, _, reply, stored_at = self._entries[best_key]
+                if time.monotonic() - stored_at <= self.ttl:
+                    self.hits += 1
+                    return reply
+            self.misses += 1
+            return None
+
+    def set(self, key: str, reply: str, scope: Optional[str] = None):
+        """Store a reply under the embedding of its message"""
+        vector = self._embed(key)
+        bucket = (scope, self._bucket(vector))
+        with self._lock:
+            stale = {bucket}
+            old = self._entries.pop(key, None)
+            if old is not None:
+                stale.add(old[0])
+            self._entries[key] = (bucket, vector, reply, time.monotonic())
+            stale.update(self._evict())
+            for b in stale:
+                self._rebuild_bucket(b)
+
+    def _evict(self) -> set:
+        """Drop expired entries, then the oldest beyond maxsize; return touched buckets"""
+        now = time.monotonic()
+        doomed = {k for k, (_, _, _, t) in self._entries.items() if now - t > self.ttl}
+        overflow = len(self._entries) - len(doomed) - self.maxsize
+        if overflow > 0:
+            doomed.update([k for k in self._entries if k not in doomed][:overflow])
+        return {self._entries.pop(k)[0] for k in doomed}
+
+    def _rebuild_bucket(self, bucket: Tuple[Optional[str], int]):
+        keys = [k for k, entry in self._entries.items() if entry[0] == bucket]
+        if keys:
+            self._buckets[bucket] = (keys, np.vstack([self._entries[k][1] for k in keys]))
+        else:
+            self._buckets.pop(bucket, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, size and bucket count"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "buckets": len(self._buckets),
+                "threshold": self.threshold,
+            }
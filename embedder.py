@@ -0,0 +1,106 @@
+import os
+import hashlib
+import threading
+from typing import List, Optional
+
+import numpy as np
+from cachetools import LRUCache
+from diskcache import Cache
+from langchain_core.embeddings import Embeddings
+
+
+def _default_onnx_file() -> str:
+    """Dynamically quantised INT8 export from the sentence-transformers model repo for this CPU
+
+    The AVX-512 VNNI build raises illegal instructions elsewhere, so it is
+    only picked when /proc/cpuinfo lists the flag; otherwise the AVX2 build.
+    """
+    try:
+        with open("/proc/cpuinfo") as f:
+            if "avx512_vnni" in f.read().split():
+                return "onnx/model_qint8_avx512_vnni.onnx"
+    except OSError:
+        pass
+    return "onnx/model_quint8_avx2.onnx"
+
+
+ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE") or _default_onnx_file()
+
+
+class MiniLMEmbeddings(Embeddings):
+    """LangChain embeddings backed by a SentenceTransformer that encodes in large batches
+
+    Runs FP16 on CUDA and the INT8 ONNX model on CPU, falling back to FP32
+    PyTorch if the ONNX backend is unavailable. Query embeddings are cached
+    as raw float32 bytes under a blake2b digest of the model variant and
+    text, in memory and in a diskcache directory that survives restarts.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        batch_size: int = 256,
+        cache_dir: Optional[str] = "./emb_cache",
+        cache_size: int = 10_000,
+    ):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        if torch.cuda.is_available():
+            self.model = SentenceTransformer(model_name, device="cuda").half()
+            self.variant = "fp16"
+        else:
+            try:
+                self.model = SentenceTransformer(
+                    model_name, device="cpu", backend="onnx", model_kwargs={"file_name": ONNX_FILE}
+                )
+                self.variant = ONNX_FILE
+            except Exception as e:
+                print(f"ONNX embeddings unavailable ({e}); using FP32 PyTorch")
+                self.model = SentenceTransformer(model_name, device="cpu")
+                self.variant = "fp32"
+        self._memory = LRUCache(maxsize=cache_size)
+        self._memory_lock = threading.Lock()
+        self._disk = Cache(cache_dir) if cache_dir else None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Unit-length float32 embeddings, one row per text"""
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        ).astype(np.float32, copy=False)
+
+    def _cache_key(self, text: str) -> bytes:
+        # MiniLM's tokenizer is uncased and ignores extra whitespace, so
+        # normalising the text first lets trivially different queries share an entry
+        normalized = " ".join(text.lower().split())
+        # The variant is part of the key: quantised and FP32 vectors differ slightly
+        return hashlib.blake2b(
+            f"{self.model_name}\0{self.variant}\0{normalized}".encode(), digest_size=16
+        ).digest()
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        """Cached query embedding as a read-only float32 vector"""
+        key = self._cache_key(text)
+        with self._memory_lock:
+            blob = self._memory.get(key)
+        if blob is None:
+            blob = self._disk.get(key) if self._disk is not None else None
+            if blob is None:
+                blob = self.encode([text])[0].tobytes()
+                if self._disk is not None:
+                    self._disk.set(key, blob)
+            with self._memory_lock:
+                self._memory[key] = blob
+        return np.frombuffer(blob, dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_query_array(text).tolist()
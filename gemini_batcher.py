@@ -0,0 +1,79 @@
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class GeminiBatcher:
+    """Coalesce Gemini prompts submitted within one short window into a single dispatch
+
+    A request that arrives alone is sent immediately; when others are
+    already queued behind it, requests are collected for up to max_wait
+    seconds or until max_batch are queued. Identical prompts in a window
+    share one call; the distinct ones are sent together with
+    generate_content_async over the model's shared channel, and each
+    caller's future receives its own response text.
+    """
+
+    def __init__(self, model, max_batch: int = 8, max_wait: float = 0.02):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # The event loop only keeps weak references to tasks; hold in-flight flushes here
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, prompt: str) -> str:
+        """Queue a prompt and wait for its response text"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # (Re)start the collector on the current loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._collect())
+        future = loop.create_future()
+        self._queue.put_nowait((prompt, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Only open a window when others are already waiting; a lone request
+            # should not pay max_wait for a batch that is unlikely to form
+            deadline = loop.time() + (self.max_wait if not self._queue.empty() else 0)
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Flush in the background so the next window starts collecting immediately
+            task = loop.create_task(self._flush(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]):
+        waiters: Dict[str, List[asyncio.Future]] = {}
+        for prompt, future in batch:
+            waiters.setdefault(prompt, []).append(future)
+
+        prompts = list(waiters)
+        results = await asyncio.gather(
+            *(self.model.generate_content_async(prompt) for prompt in prompts),
+            return_exceptions=True,
+        )
+        for prompt, result in zip(prompts, results):
+            for future in waiters[prompt]:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    try:
+                        future.set_result(result.text)
+                    except Exception as e:
+                        # .text raises when the response was blocked
+                        future.set_exception(e)
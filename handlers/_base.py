@@ -0,0 +1,243 @@
+import asyncio
+import re
+import orjson
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Mapping, Optional, Type
+from llm_client import get_model
+from ._llm_cache import SemanticCache, generate_text_async, stream_text
+
+_DATA_DIR = Path(__file__).parent.parent / 'data'
+
+_WORD_RE = re.compile(r'\S+')
+
+# Places whose mention changes an answer (other city, other hotels or numbers)
+_PLACES = (
+    "ranchi", "jamshedpur", "tatanagar", "deoghar", "dhanbad", "bokaro", "hazaribagh",
+    "giridih", "dumka", "palamu", "khunti", "gumla", "netarhat", "betla", "dalma",
+    "hundru", "jonha", "dassam", "patratu", "parasnath", "rajrappa", "baidyanath",
+)
+_PLACE_RE = re.compile(r'\b(?:' + '|'.join(_PLACES) + r')\b')
+
+
+def data_path(filename: str) -> Path:
+    """Resolve a data file, falling back to a path relative to the working directory"""
+    path = _DATA_DIR / filename
+    if not path.exists():
+        path = Path('data') / filename
+    return path
+
+
+def named_places(query: str) -> List[str]:
+    """Jharkhand places named in the query, in order of mention"""
+    return _PLACE_RE.findall(query.lower())
+
+
+def cache_scope(query: str, *patterns: re.Pattern) -> Optional[str]:
+    """Semantic cache scope: the places (and any other patterns) named in the query
+
+    Queries only share a cached reply when they name the same set, so a
+    paraphrase about another city never hits.
+    """
+    text = query.lower()
+    names = {match for pattern in (_PLACE_RE, *patterns) for match in pattern.findall(text)}
+    return ",".join(sorted(names)) or None
+
+
+def canonical_reply(canonical: Mapping[str, str], query: str) -> Optional[str]:
+    """Return the pre-built reply when the query is one of the canonical ones"""
+    return canonical.get(" ".join(query.lower().split()).rstrip("?!."))
+
+
+class FallbackReply(str):
+    """Canned text served because the LLM path failed; callers must not cache it"""
+    __slots__ = ()
+
+
+class IncompleteReply(Exception):
+    """The LLM failed after streaming part of a reply
+
+    Carries the handler's canned reply for callers that have not sent
+    anything to the client yet.
+    """
+
+    def __init__(self, fallback: FallbackReply):
+        super().__init__("LLM stream failed after the first chunk")
+        self.fallback = fallback
+
+
+class BaseHandler:
+    """Shared model setup, data loading and response trimming for the LLM handlers"""
+    __slots__ = ('model', 'data', 'data_json')
+
+    MODEL_NAME = 'gemini-2.5-flash'
+    DATA_FILE: Optional[Path] = None
+    TRUNCATION_SUFFIX = "..."
+    RESPONSE_CACHE: Optional[SemanticCache] = None
+
+    def __init__(self, gemini_api_key: str):
+        self.model = get_model(self.MODEL_NAME, gemini_api_key, warm=True)
+        self.data = self._load_json(self.DATA_FILE)
+
+        # Data never changes after load, so serialise the prompt context once.
+        # Compact output keeps whitespace out of the billed input tokens;
+        # default=dict lets orjson serialise read-only MappingProxyType defaults
+        self.data_json = orjson.dumps(self.data, default=dict).decode()
+
+    @classmethod
+    def warm_up(cls, gemini_api_key: str):
+        """Create and warm this handler's model ahead of the first request"""
+        get_model(cls.MODEL_NAME, gemini_api_key, warm=True)
+
+    def _load_json(self, path: Optional[Path]):
+        """Load a JSON data file, using the handler's default data if that fails"""
+        try:
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
+        except:
+            return self._get_default_data()
+
+    def _get_default_data(self):
+        """Fallback data used when the data file is missing or invalid"""
+        return {}
+
+    def _ensure_concise(self, response: str) -> str:
+        """Ensure response is under 100 words"""
+        # Fewer than 100 whitespace characters means at most 100 words
+        if response.count(' ') + response.count('\n') + response.count('\t') < 100:
+            return response
+        return "".join(self._stream_concise((response,)))
+
+    def _stream_concise(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Stream a response, cutting it after 95 words once it runs past 100"""
+        words = 0     # words already yielded (at most 95)
+        pending = ""  # text received after the last yielded word
+        for chunk in chunks:
+            pending += chunk
+            # Only the unsent tail is scanned, and never for more words than decide the cut
+            word_ends = [match.end() for match in islice(_WORD_RE.finditer(pending), 101 - words)]
+            if words + len(word_ends) > 100:
+                yield (pending[:word_ends[94 - words]] if words < 95 else "") + self.TRUNCATION_SUFFIX
+                return
+
+            # The last word may still be growing unless the text ends in whitespace
+            complete = word_ends if pending[-1:].isspace() else word_ends[:-1]
+            complete = complete[:95 - words]
+            if complete:
+                yield pending[:complete[-1]]
+                pending = pending[complete[-1]:]
+                words += len(complete)
+        if pending:
+            yield pending
+
+    def _build_prompt(self, query: str) -> str:
+        """Prompt combining the user query with the preloaded data context"""
+        raise NotImplementedError
+
+    def _create_fallback_response(self, query: str) -> str:
+        """Canned reply served when the LLM fails"""
+        raise NotImplementedError
+
+    def respond(self, query: str) -> Iterator[str]:
+        """Stream the concise reply to a query, or the fallback if the LLM fails"""
+        prompt = self._build_prompt(query)
+        # Trimmed inside the cached computation, so both caches store the concise reply
+        chunks = self.RESPONSE_CACHE.stream_or_set(
+            query, lambda: self._stream_reply(prompt), self._cache_scope(query)
+        )
+        return self._stream_or_fallback(chunks, lambda: self._create_fallback_response(query))
+
+    async def respond_async(self, query: str) -> str:
+        """Async variant of respond for batched requests"""
+        prompt = self._build_prompt(query)
+        try:
+            return await self.RESPONSE_CACHE.aget_or_set(
+                query, lambda: self._generate_reply_async(prompt), self._cache_scope(query)
+            )
+        except:
+            return FallbackReply(self._create_fallback_response(query))
+
+    def _cache_scope(self, query: str) -> Optional[str]:
+        """Scope of the query's semantic cache entry; see cache_scope"""
+        return cache_scope(query)
+
+    def _stream_reply(self, prompt: str) -> Iterator[str]:
+        """Stream the concise Gemini reply; the prompt cache stores the trimmed text"""
+        return stream_text(self.model, prompt, self._stream_concise)
+
+    async def _generate_reply_async(self, prompt: str) -> str:
+        """Async counterpart of _stream_reply, returning the whole concise reply"""
+        return self._ensure_concise(await generate_text_async(self.model, prompt))
+
+    @staticmethod
+    def _stream_or_fallback(chunks: Iterable[str], fallback: Callable[[], str]) -> Iterator[str]:
+        """Yield LLM chunks, or the fallback reply if the LLM fails before producing text
+
+        A failure after the first chunk is raised as IncompleteReply: a
+        streaming caller has already sent part of the reply and must not
+        treat the cut-off text as complete.
+        """
+        started = False
+        try:
+            for chunk in chunks:
+                started = True
+                yield chunk
+        except Exception as e:
+            if started:
+                raise IncompleteReply(FallbackReply(fallback())) from e
+            yield FallbackReply(fallback())
+
+
+class HandlerEntry:
+    """Module-level entry points for one handler class
+
+    Canonical queries (lowercased, whitespace-collapsed) get their pre-built
+    reply without a Gemini call, a missing key gets the no-key reply and a
+    handler that fails to build gets the error reply. Everything else goes
+    to the handler, built once per API key and reused across calls.
+    """
+    __slots__ = ('canonical', 'no_key_reply', 'error_reply', '_handler')
+
+    def __init__(self, handler_cls: Type[BaseHandler], canonical: Mapping[str, str],
+                 no_key_reply: str, error_reply: str):
+        self.canonical = canonical
+        self.no_key_reply = no_key_reply
+        self.error_reply = error_reply
+        self._handler = lru_cache(maxsize=4)(handler_cls)
+
+    def stream(self, user_query: str, gemini_api_key: str) -> Iterator[str]:
+        """Stream the reply to a query as Gemini produces it"""
+        reply = canonical_reply(self.canonical, user_query)
+        if reply is not None:
+            yield reply
+            return
+
+        if not gemini_api_key:
+            yield self.no_key_reply
+            return
+
+        try:
+            chunks = self._handler(gemini_api_key).respond(user_query)
+        except Exception:
+            yield self.error_reply
+            return
+        yield from chunks
+
+    def reply(self, user_query: str, gemini_api_key: str) -> str:
+        """Whole reply to a query"""
+        return "".join(self.stream(user_query, gemini_api_key))
+
+    async def batch(self, user_queries: List[str], gemini_api_key: str) -> List[str]:
+        """Answer several queries concurrently, overlapping their Gemini calls"""
+        canonical = [canonical_reply(self.canonical, query) for query in user_queries]
+        pending = [query for query, reply in zip(user_queries, canonical) if reply is None]
+        if not gemini_api_key:
+            return [reply or self.no_key_reply for reply in canonical]
+
+        try:
+            handler = self._handler(gemini_api_key)
+            replies = iter(await asyncio.gather(*(handler.respond_async(query) for query in pending)))
+            return [reply or next(replies) for reply in canonical]
+        except Exception:
+            return [reply or self.error_reply for reply in canonical]
@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import threading
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from cachetools import TTLCache
+from llm_client import load_genai
+
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+# Cached responses must be reproducible, so every cached call is greedy
+_GENERATION_CONFIG = {"temperature": 0}
+
+# Exact-match cache for byte-identical prompts, keyed by sha256(prompt)
+_PROMPT_CACHE = TTLCache(maxsize=1024, ttl=3600)
+_PROMPT_CACHE_LOCK = threading.Lock()
+
+
+def _prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def generate_text(model, prompt: str) -> str:
+    """Return the Gemini response text for a prompt, reusing identical earlier prompts"""
+    key = _prompt_key(prompt)
+    with _PROMPT_CACHE_LOCK:
+        cached = _PROMPT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    text = model.generate_content(prompt, generation_config=_GENERATION_CONFIG).text
+    with _PROMPT_CACHE_LOCK:
+        _PROMPT_CACHE[key] = text
+    return text
+
+
+async def generate_text_async(model, prompt: str) -> str:
+    """Async variant of generate_text using the SDK's generate_content_async"""
+    key = _prompt_key(prompt)
+    with _PROMPT_CACHE_LOCK:
+        cached = _PROMPT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    response = await model.generate_content_async(prompt, generation_config=_GENERATION_CONFIG)
+    text = response.text
+    with _PROMPT_CACHE_LOCK:
+        _PROMPT_CACHE[key] = text
+    return text
+
+
+def stream_text(
+    model,
+    prompt: str,
+    shape: Optional[Callable[[Iterable[str]], Iterator[str]]] = None,
+) -> Iterator[str]:
+    """Yield Gemini response chunks as they arrive; the full text is cached once complete
+
+    shape (e.g. a truncating filter) is applied before caching, so a reply it
+    cuts short, without reading the rest of the stream, is still stored.
+    """
+    key = _prompt_key(prompt)
+    with _PROMPT_CACHE_LOCK:
+        cached = _PROMPT_CACHE.get(key)
+    if cached is not None:
+        # generate_text may have stored this prompt's reply unshaped
+        yield from shape((cached,)) if shape else (cached,)
+        return
+
+    stream = (
+        chunk.text
+        for chunk in model.generate_content(prompt, stream=True, generation_config=_GENERATION_CONFIG)
+    )
+    chunks = []
+    for chunk in shape(stream) if shape else stream:
+        chunks.append(chunk)
+        yield chunk
+    with _PROMPT_CACHE_LOCK:
+        _PROMPT_CACHE[key] = "".join(chunks)
+
+
+@lru_cache(maxsize=256)
+def _embed(text: str) -> np.ndarray:
+    """Embed text with Gemini and normalise it to a unit float32 vector"""
+    result = load_genai().embed_content(
+        model=EMBEDDING_MODEL,
+        content=text,
+        task_type="semantic_similarity",
+    )
+    vector = np.asarray(result["embedding"], dtype=np.float32)
+    vector /= np.linalg.norm(vector) or 1.0
+    vector.setflags(write=False)
+    return vector
+
+
+class SemanticCache:
+    """Return a stored LLM response when a new query is close enough to a cached one
+
+    Each entry belongs to a scope (e.g. the places a query names) and a
+    lookup only matches entries of the same scope, so "police number in
+    Dhanbad" can never be answered with the cached Ranchi reply.
+    """
+
+    def __init__(self, threshold: float = 0.92, maxsize: int = 512, ttl: Optional[float] = 3600):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: Dict[Tuple[Optional[str], str], Tuple[np.ndarray, str, float]] = {}
+        # scope -> (queries, matrix whose row i is the embedding of queries[i])
+        self._shards: Dict[Optional[str], Tuple[List[str], np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, query: str, scope: Optional[str] = None) -> Optional[str]:
+        """Look up the closest cached query in the scope and return its response if similar enough"""
+        vector = _embed(query)
+        with self._lock:
+            shard = self._shards.get(scope)
+            if shard is None:
+                return None
+            queries, matrix = shard
+            similarities = matrix @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            _, response, stored_at = self._entries[(scope, queries[best])]
+        if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+            return None
+        return response
+
+    def set(self, query: str, response: str, scope: Optional[str] = None):
+        """Store a response under the embedding of its query"""
+        vector = _embed(query)
+        with self._lock:
+            self._entries.pop((scope, query), None)
+            self._entries[(scope, query)] = (vector, response, time.monotonic())
+            self._evict()
+            self._rebuild_shards()
+
+    def get_or_set(self, query: str, compute: Callable[[], str], scope: Optional[str] = None) -> str:
+        """Serve a cached response or compute, store and return a fresh one"""
+        try:
+            cached = self.get(query, scope)
+        except Exception:
+            # Embedding failures should never block the actual LLM call
+            return compute()
+        if cached is not None:
+            return cached
+
+        response = compute()
+        try:
+            self.set(query, response, scope)
+        except Exception:
+            pass
+        return response
+
+    def stream_or_set(
+        self, query: str, compute: Callable[[], Iterator[str]], scope: Optional[str] = None
+    ) -> Iterator[str]:
+        """Streaming variant of get_or_set; only a fully streamed response is stored"""
+        try:
+            cached = self.get(query, scope)
+        except Exception:
+            yield from compute()
+            return
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        for chunk in compute():
+            chunks.append(chunk)
+            yield chunk
+        try:
+            self.set(query, "".join(chunks), scope)
+        except Exception:
+            pass
+
+    async def aget_or_set(
+        self, query: str, compute: Callable[[], Awaitable[str]], scope: Optional[str] = None
+    ) -> str:
+        """Async variant of get_or_set; the embedding lookup runs in a worker thread"""
+        try:
+            cached = await asyncio.to_thread(self.get, query, scope)
+        except Exception:
+            return await compute()
+        if cached is not None:
+            return cached
+
+        response = await compute()
+        try:
+            # The query embedding is memoised by now, so this does not block on the network
+            self.set(query, response, scope)
+        except Exception:
+            pass
+        return response
+
+    def _evict(self):
+        """Drop expired entries, then the oldest ones beyond maxsize"""
+        if self.ttl is not None:
+            now = time.monotonic()
+            for key in [k for k, (_, _, t) in self._entries.items() if now - t > self.ttl]:
+                del self._entries[key]
+        while len(self._entries) > self.maxsize:
+            del self._entries[next(iter(self._entries))]
+
+    def _rebuild_shards(self):
+        grouped: Dict[Optional[str], Tuple[List[str], List[np.ndarray]]] = {}
+        for (scope, query), (vector, _, _) in self._entries.items():
+            queries, vectors = grouped.setdefault(scope, ([], []))
+            queries.append(query)
+            vectors.append(vector)
+        self._shards = {scope: (queries, np.vstack(vectors)) for scope, (queries, vectors) in grouped.items()}
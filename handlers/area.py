@@ -1,58 +1,133 @@
 import json
 import os
-from typing import Dict, Optional
-from pathlib import Path
-import google.generativeai as genai
-
-class AreaSuggestions:
-    def __init__(self, gemini_api_key: str):
-        genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-        self.load_location_data()        
- 
-    def load_location_data(self):
-        """Load location data as context for LLM"""
-        try:
-            data_path = Path(__file__).parent.parent / 'data' / 'locations.json'
-            if not data_path.exists():
-                data_path = Path('data/locations.json')
-            
-            with open(data_path, 'r', encoding='utf-8') as f:
-                self.location_data = json.load(f)
-        except:
-            self.location_data = self._get_default_location_data()
+import re
+from typing import Dict, Iterable, Iterator, Optional
+from types import MappingProxyType
+from ._base import BaseHandler, FallbackReply, HandlerEntry, data_path
+from ._llm_cache import SemanticCache, generate_text, generate_text_async, stream_text
+
+_CONTEXT_CACHE = SemanticCache()
+_RESPONSE_CACHE = SemanticCache()
+
+# Debug only: run the old two-call pipeline (extract context, then suggest)
+_EXTRACT_CONTEXT = os.getenv("AREA_EXTRACT_CONTEXT") == "1"
+
+_CITIES = frozenset({"ranchi", "jamshedpur", "deoghar", "dhanbad", "bokaro"})
+_CITY_RE = re.compile(r'\b(?:' + '|'.join(sorted(_CITIES)) + r')\b')
+
+# Footer with practical info, appended to every LLM suggestion
+_FOOTER = (
+    "\n\n" + "=" * 40 + "\n"
+    "📱 **Quick Info:**\n"
+    "• Tourism Helpline: 1800-123-4567\n"
+    "• Best season: October to March\n"
+    "• Local transport: Auto, taxi, buses available\n"
+)
+
+_JSON_BLOB_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+_NO_KEY_REPLY = "I'd love to suggest nearby places! However, I need the API key configured. Please contact the administrator."
+_ERROR_REPLY = FallbackReply(
+    "🗺️ I'd be happy to suggest nearby places in Jharkhand! "
+    "Try asking:\n"
+    "• 'What places are near Ranchi?'\n"
+    "• 'Waterfalls around Jamshedpur'\n"
+    "• 'Temple visits near Deoghar'\n"
+    "• 'Weekend spots for families near Ranchi'\n\n"
+    "I'll provide personalized suggestions based on your preferences!"
+)
+
+
+def _detect_location(text: str) -> Optional[str]:
+    """Return the first known Jharkhand city mentioned in text"""
+    city_match = _CITY_RE.search(text.lower())
+    return city_match.group(0) if city_match else None
+
+
+def _load_json_object(text: str) -> Optional[Dict]:
+    """Parse the JSON object embedded in an LLM response"""
+    json_match = _JSON_BLOB_RE.search(text)
+    if not json_match:
+        return None
+    try:
+        return json.loads(json_match.group())
+    except json.JSONDecodeError:
+        # The greedy match ran past the object (e.g. a stray "}" in trailing text)
+        json_blob = _find_json_object(text)
+        if json_blob is None:
+            raise
+        return json.loads(json_blob)
+
+
+def _find_json_object(text: str) -> Optional[str]:
+    """Return the first balanced {...} block in text, found by a linear brace scan"""
+    start = text.find('{')
+    if start < 0:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+_DEFAULT_LOCATION_DATA = MappingProxyType({
+    "ranchi": {
+        "attractions": [
+            "Hundru Falls (45 km) - 98m high waterfall",
+            "Jonha Falls (40 km) - Buddhist monastery nearby",
+            "Rock Garden (4 km) - Sculptures and evening walks",
+            "Tagore Hill (3 km) - Panoramic city views",
+            "Pahari Mandir (2 km) - Hilltop Shiva temple"
+        ]
+    },
+    "jamshedpur": {
+        "attractions": [
+            "Dalma Wildlife Sanctuary (30 km) - Elephant habitat",
+            "Dimna Lake (13 km) - Boating and water sports",
+            "Jubilee Park (in city) - Rose garden and zoo"
+        ]
+    },
+    "deoghar": {
+        "attractions": [
+            "Baidyanath Temple (in city) - One of 12 Jyotirlingas",
+            "Naulakha Temple (1.5 km) - 146 feet high",
+            "Trikuta Parvata (16 km) - Ropeway and scenic views"
+        ]
+    }
+})
+
+
+class AreaSuggestions(BaseHandler):
+    __slots__ = ()
     
-    def _get_default_location_data(self):
+    MODEL_NAME = 'gemini-2.5-flash'
+    DATA_FILE = data_path('locations.json')
+    
+    def _get_default_data(self):
         """Fallback data if JSON not available"""
-        return {
-            "ranchi": {
-                "attractions": [
-                    "Hundru Falls (45 km) - 98m high waterfall",
-                    "Jonha Falls (40 km) - Buddhist monastery nearby",
-                    "Rock Garden (4 km) - Sculptures and evening walks",
-                    "Tagore Hill (3 km) - Panoramic city views",
-                    "Pahari Mandir (2 km) - Hilltop Shiva temple"
-                ]
-            },
-            "jamshedpur": {
-                "attractions": [
-                    "Dalma Wildlife Sanctuary (30 km) - Elephant habitat",
-                    "Dimna Lake (13 km) - Boating and water sports",
-                    "Jubilee Park (in city) - Rose garden and zoo"
-                ]
-            },
-            "deoghar": {
-                "attractions": [
-                    "Baidyanath Temple (in city) - One of 12 Jyotirlingas",
-                    "Naulakha Temple (1.5 km) - 146 feet high",
-                    "Trikuta Parvata (16 km) - Ropeway and scenic views"
-                ]
-            }
-        }
+        return _DEFAULT_LOCATION_DATA
     
-    def extract_context(self, user_query: str) -> Dict:
-        """Use LLM to understand user's request"""
-        prompt = f"""
+    def _build_context_prompt(self, user_query: str) -> str:
+        """Prompt asking the LLM to extract structured context from a query"""
+        return f"""
         Analyze this query about nearby places in Jharkhand:
         Query: "{user_query}"
         
@@ -67,18 +142,34 @@ class AreaSuggestions:
         
         Common Jharkhand cities: Ranchi, Jamshedpur, Deoghar, Dhanbad, Bokaro
         """
+    
+    def extract_context(self, user_query: str) -> Dict:
+        """Use LLM to understand user's request"""
+        prompt = self._build_context_prompt(user_query)
         
         try:
-            response = self.model.generate_content(prompt)
+            response_text = _CONTEXT_CACHE.get_or_set(
+                user_query, lambda: generate_text(self.model, prompt), self._cache_scope(user_query)
+            )
             # Parse response - implement proper JSON extraction
-            return self._parse_llm_response(response.text)
+            return self._parse_llm_response(response_text)
+        except:
+            return {"location": None, "attraction_type": "any"}
+    
+    async def extract_context_async(self, user_query: str) -> Dict:
+        """Async variant of extract_context for batched requests"""
+        prompt = self._build_context_prompt(user_query)
+        
+        try:
+            response_text = await _CONTEXT_CACHE.aget_or_set(
+                user_query, lambda: generate_text_async(self.model, prompt), self._cache_scope(user_query)
+            )
+            return self._parse_llm_response(response_text)
         except:
             return {"location": None, "attraction_type": "any"}
     
     def _parse_llm_response(self, response_text: str) -> Dict:
         """Parse LLM response to extract parameters"""
-        import re
-        
         # Default context
         context = {
             "location": None,
@@ -90,32 +181,25 @@ class AreaSuggestions:
         
         try:
             # Try to extract JSON
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                extracted = json.loads(json_match.group())
+            extracted = _load_json_object(response_text)
+            if extracted:
                 for key, value in extracted.items():
                     if value and value != "null":
                         context[key] = value
         except:
             # Fallback to simple extraction
-            text_lower = response_text.lower()
-            
-            # Extract location
-            for city in ["ranchi", "jamshedpur", "deoghar", "dhanbad", "bokaro"]:
-                if city in text_lower:
-                    context["location"] = city
-                    break
+            context["location"] = _detect_location(response_text)
         
         return context
     
-    def generate_suggestions(self, context: Dict) -> str:
-        """Use LLM to generate contextual suggestions"""
+    def _build_suggestion_prompt(self, context: Dict) -> str:
+        """Prompt asking the LLM for suggestions matching the extracted context"""
         location = context.get("location")
         
         # Build location data string
-        if location and location.lower() in self.location_data:
+        if location and location.lower() in self.data:
             location_info = f"Available attractions near {location}:\n"
-            attractions = self.location_data[location.lower()].get("attractions", [])
+            attractions = self.data[location.lower()].get("attractions", [])
             location_info += "\n".join(f"- {attr}" for attr in attractions)
         else:
             # Provide general Jharkhand attractions
@@ -127,7 +211,7 @@ class AreaSuggestions:
             Betla National Park: Wildlife and nature"""
         
         # Create prompt for suggestions
-        suggestion_prompt = f"""
+        return f"""
         You are a friendly Jharkhand tourism guide. Based on this context, suggest nearby places:
         
         User Context:
@@ -154,34 +238,135 @@ class AreaSuggestions:
         Mention specific local food or experiences where relevant.
         Make the response ~100 words max crisp and rich
         """
+    
+    def generate_suggestions(self, context: Dict) -> Iterator[str]:
+        """Use LLM to stream contextual suggestions"""
+        suggestion_prompt = self._build_suggestion_prompt(context)
+        chunks = stream_text(self.model, suggestion_prompt)
+        
+        return self._stream_or_fallback(
+            self._stream_with_footer(chunks, context),
+            lambda: self._create_fallback_suggestions(context)
+        )
+    
+    async def generate_suggestions_async(self, context: Dict) -> str:
+        """Async variant of generate_suggestions for batched requests"""
+        suggestion_prompt = self._build_suggestion_prompt(context)
         
         try:
-            response = self.model.generate_content(suggestion_prompt)
-            return self._format_final_suggestions(response.text, context)
+            response_text = await generate_text_async(self.model, suggestion_prompt)
+            return self._format_final_suggestions(response_text, context)
         except Exception as e:
-            return self._create_fallback_suggestions(context)
+            return FallbackReply(self._create_fallback_suggestions(context))
     
-    def _format_final_suggestions(self, llm_response: str, context: Dict) -> str:
-        """Add consistent formatting and additional info"""
-        formatted = llm_response
+    def _build_combined_prompt(self, user_query: str) -> str:
+        """Single prompt that reads the query's context and writes the suggestions"""
+        return f"""
+        You are a friendly Jharkhand tourism guide. A visitor asked:
+        "{user_query}"
         
-        # Add footer with practical info
-        formatted += "\n\n" + "="*40 + "\n"
-        formatted += "📱 **Quick Info:**\n"
-        formatted += "• Tourism Helpline: 1800-123-4567\n"
-        formatted += "• Best season: October to March\n"
-        formatted += "• Local transport: Auto, taxi, buses available\n"
+        From the query, work out their location, interest type, distance preference,
+        group and time available. Assume "any" for whatever is not mentioned.
         
-        if context.get("location"):
-            formatted += f"• Weather in {context['location'].title()}: Check current conditions\n"
+        Known attractions around Jharkhand cities:
+        {self.data_json}
         
-        return formatted
+        Provide suggestions in this format:
+        1. Start with a warm greeting
+        2. List 3-5 relevant places with:
+           - Name and distance
+           - What makes it special
+           - Best time to visit
+           - Quick tip
+        3. Group by distance if applicable (Walking distance, Short drive, Day trip)
+        4. Add practical tips at the end
+        5. Use emojis for visual appeal
+        
+        Keep the tone conversational and helpful, like a local friend giving advice.
+        Mention specific local food or experiences where relevant.
+        Make the response ~100 words max crisp and rich
+        """
+    
+    def suggest(self, user_query: str) -> Iterator[str]:
+        """Stream the answer to a nearby-places query from one Gemini call"""
+        context = {"location": _detect_location(user_query)}
+        prompt = self._build_combined_prompt(user_query)
+        # Scoped by the places named, so the cached body matches this query's city footer
+        chunks = _RESPONSE_CACHE.stream_or_set(
+            user_query, lambda: stream_text(self.model, prompt), self._cache_scope(user_query)
+        )
+        
+        return self._stream_or_fallback(
+            self._stream_with_footer(chunks, context),
+            lambda: self._create_fallback_suggestions(context)
+        )
+    
+    async def suggest_async(self, user_query: str) -> str:
+        """Async variant of suggest for batched requests"""
+        context = {"location": _detect_location(user_query)}
+        prompt = self._build_combined_prompt(user_query)
+        
+        try:
+            response_text = await _RESPONSE_CACHE.aget_or_set(
+                user_query, lambda: generate_text_async(self.model, prompt), self._cache_scope(user_query)
+            )
+            return self._format_final_suggestions(response_text, context)
+        except Exception as e:
+            return FallbackReply(self._create_fallback_suggestions(context))
+    
+    def respond(self, user_query: str) -> Iterator[str]:
+        """Stream suggestions for a query, extracting its context first if configured"""
+        if _EXTRACT_CONTEXT:
+            return self.generate_suggestions(self.extract_context(user_query))
+        return self.suggest(user_query)
+    
+    async def respond_async(self, user_query: str) -> str:
+        """Async variant of respond for batched requests"""
+        if _EXTRACT_CONTEXT:
+            return await self.generate_suggestions_async(await self.extract_context_async(user_query))
+        return await self.suggest_async(user_query)
+    
+    def _format_final_suggestions(self, llm_response: str, context: Dict) -> str:
+        """Add consistent formatting and additional info"""
+        return f"{llm_response}{self._suggestion_footer(context)}"
+    
+    def _stream_with_footer(self, chunks: Iterable[str], context: Dict) -> Iterator[str]:
+        """Streaming counterpart of _format_final_suggestions"""
+        yield from chunks
+        yield self._suggestion_footer(context)
+    
+    def _suggestion_footer(self, context: Dict) -> str:
+        """Practical-info footer, with a weather pointer when the city is known"""
+        return _footer_for(context.get("location"))
     
     def _create_fallback_suggestions(self, context: Dict) -> str:
         """Fallback if LLM fails"""
-        location = context.get("location", "Jharkhand")
-        
-        return f"""🗺️ **Exploring {location.title()}!**
+        location = context.get("location")
+        if location in _CITY_SUGGESTIONS:
+            return _CITY_SUGGESTIONS[location]
+        if location in _FB_SUGGESTIONS:
+            return _FB_SUGGESTIONS[location]
+        return _render_fallback(location)
+
+def _footer_for(location: Optional[str]) -> str:
+    if location:
+        return f"{_FOOTER}• Weather in {location.title()}: Check current conditions\n"
+    return _FOOTER
+
+def _render_city(city: str) -> str:
+    """Canned suggestions built from the city's own attractions, with the usual footer"""
+    attractions = "\n".join(f"• {attraction}" for attraction in _DEFAULT_LOCATION_DATA[city]["attractions"])
+    return (
+        f"🗺️ **Places near {city.title()}:**\n\n{attractions}\n\n"
+        "💡 **Tips:** Start early, carry water, and don't miss trying local dhuska!"
+        f"{_footer_for(city)}"
+    )
+
+def _render_fallback(location: Optional[str]) -> str:
+    """Canned attractions list headed by the given location"""
+    location = location or "Jharkhand"
+    
+    return f"""🗺️ **Exploring {location.title()}!**
 
 I'd love to help you discover nearby attractions! Here are some popular spots:
 
@@ -203,33 +388,24 @@ I'd love to help you discover nearby attractions! Here are some popular spots:
 Need specific directions or timings? Just ask!
 """
 
-def nearby_suggestions(user_query: str, gemini_api_key: str) -> str:
-    """Main function for area suggestions"""
-    if not gemini_api_key:
-        return "I'd love to suggest nearby places! However, I need the API key configured. Please contact the administrator."
-    
-    try:
-        area_guide = AreaSuggestions(gemini_api_key)
-        
-        # Extract context using LLM
-        context = area_guide.extract_context(user_query)
-        
-        # Generate suggestions
-        suggestions = area_guide.generate_suggestions(context)
-        
-        return suggestions
-        
-    except Exception as e:
-        return (
-            "🗺️ I'd be happy to suggest nearby places in Jharkhand! "
-            "Try asking:\n"
-            "• 'What places are near Ranchi?'\n"
-            "• 'Waterfalls around Jamshedpur'\n"
-            "• 'Temple visits near Deoghar'\n"
-            "• 'Weekend spots for families near Ranchi'\n\n"
-            "I'll provide personalized suggestions based on your preferences!"
-        )
-    
+# Keyword detection only ever yields a known city or None, so render those once
+_FB_SUGGESTIONS = {location: _render_fallback(location) for location in (*_CITIES, None)}
+# Cities with attraction data get a reply listing their own places, not the statewide one
+_CITY_SUGGESTIONS = {city: _render_city(city) for city in _DEFAULT_LOCATION_DATA}
+
+_CANONICAL = {
+    "nearby places": _FB_SUGGESTIONS[None],
+    "places to visit in jharkhand": _FB_SUGGESTIONS[None],
+    **{f"places near {city}": reply for city, reply in _CITY_SUGGESTIONS.items()},
+    **{f"places to visit in {city}": reply for city, reply in _CITY_SUGGESTIONS.items()},
+}
+
+_ENTRY = HandlerEntry(AreaSuggestions, _CANONICAL, _NO_KEY_REPLY, _ERROR_REPLY)
+
+nearby_suggestions_stream = _ENTRY.stream
+nearby_suggestions = _ENTRY.reply
+nearby_suggestions_batch = _ENTRY.batch
+
 # from dotenv import load_dotenv
 # load_dotenv()
 # print(nearby_suggestions("I'm in Ranchi, what can I see nearby?", os.getenv("GOOGLE_API_KEY")))
\ No newline at end of file
@@ -1,57 +1,84 @@
-import json
 import os
-from pathlib import Path
-import google.generativeai as genai
+from types import MappingProxyType
+from ._base import BaseHandler, FallbackReply, HandlerEntry, data_path
+from ._llm_cache import SemanticCache
 
-class HotelSuggestions:
-    def __init__(self, gemini_api_key: str):
-        genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-        self.load_hotel_data()
-        
-    def load_hotel_data(self):
-        """Load hotel data for context"""
-        try:
-            data_path = Path(__file__).parent.parent / 'data' / 'hotels.json'
-            if not data_path.exists():
-                data_path = Path('data/hotels.json')
-            
-            with open(data_path, 'r', encoding='utf-8') as f:
-                self.hotel_data = json.load(f)
-        except:
-            self.hotel_data = self._get_default_hotel_data()
+_NO_KEY_REPLY = "Hotel search needs API configuration. Please contact support."
+_ERROR_REPLY = FallbackReply(
+    "🏨 Popular Jharkhand stays:\n"
+    "Ranchi: Radisson Blu, Capitol Hill\n"
+    "Jamshedpur: The Sonnet, Ramada\n"
+    "Netarhat: Forest Rest House\n"
+    "Book via MakeMyTrip or call hotels directly!"
+)
+
+_FB_HOTELS = (
+    "🏨 Jharkhand Hotels:\n\n"
+    "💎 Luxury: Radisson Blu Ranchi (₹5000+)\n"
+    "🏢 Mid: Ginger Hotels (₹2000-3000)\n"
+    "💰 Budget: OYO/Guest houses (₹800-1500)\n\n"
+    "📍 Book: MakeMyTrip, Booking.com\n"
+    "💡 Tip: Book early during festivals!"
+)
+_DEFAULT_HOTEL_DATA = MappingProxyType({
+    "ranchi": {
+        "luxury": ["Radisson Blu", "The Capitol Hill"],
+        "mid_range": ["Hotel Arya", "Hotel Yuvraj Palace"],
+        "budget": ["Hotel Akash", "OYO rooms"]
+    },
+    "jamshedpur": {
+        "luxury": ["The Sonnet", "Ramada"],
+        "mid_range": ["Ginger Hotel", "Hotel Dayal"],
+        "budget": ["Hotel Jiva", "Various OYOs"]
+    },
+    "deoghar": {
+        "luxury": ["Hotel Mahadev Palace"],
+        "mid_range": ["Hotel Rajkamal", "Hotel Ashoka"],
+        "budget": ["Dharamshala options", "Guest houses"]
+    }
+})
+
+
+def _render_city(city: str) -> str:
+    """Canned reply listing the city's own hotels from the default data"""
+    tiers = _DEFAULT_HOTEL_DATA[city]
+    return (
+        f"🏨 {city.title()} Hotels:\n\n"
+        f"💎 Luxury: {', '.join(tiers['luxury'])}\n"
+        f"🏢 Mid-range: {', '.join(tiers['mid_range'])}\n"
+        f"💰 Budget: {', '.join(tiers['budget'])}\n\n"
+        "📍 Book: MakeMyTrip, Booking.com\n"
+        "💡 Tip: Book early during festivals!"
+    )
+
+
+_CANONICAL = {
+    "hotels": _FB_HOTELS,
+    "hotels in jharkhand": _FB_HOTELS,
+    **{f"hotels in {city}": _render_city(city) for city in _DEFAULT_HOTEL_DATA},
+}
+
+
+class HotelSuggestions(BaseHandler):
+    __slots__ = ()
+    
+    MODEL_NAME = 'gemini-2.0-flash'
+    DATA_FILE = data_path('hotels.json')
+    RESPONSE_CACHE = SemanticCache()
+    TRUNCATION_SUFFIX = "... Book via MakeMyTrip/Booking.com"
     
-    def _get_default_hotel_data(self):
+    def _get_default_data(self):
         """Fallback hotel data"""
-        return {
-            "ranchi": {
-                "luxury": ["Radisson Blu", "The Capitol Hill"],
-                "mid_range": ["Hotel Arya", "Hotel Yuvraj Palace"],
-                "budget": ["Hotel Akash", "OYO rooms"]
-            },
-            "jamshedpur": {
-                "luxury": ["The Sonnet", "Ramada"],
-                "mid_range": ["Ginger Hotel", "Hotel Dayal"],
-                "budget": ["Hotel Jiva", "Various OYOs"]
-            },
-            "deoghar": {
-                "luxury": ["Hotel Mahadev Palace"],
-                "mid_range": ["Hotel Rajkamal", "Hotel Ashoka"],
-                "budget": ["Dharamshala options", "Guest houses"]
-            }
-        }
+        return _DEFAULT_HOTEL_DATA
     
-    def generate_suggestions(self, query: str) -> str:
-        """Generate concise hotel suggestions"""
-        # Convert hotel data to string for context
-        hotel_context = json.dumps(self.hotel_data, indent=2)
-        
-        prompt = f"""
+    def _build_prompt(self, query: str) -> str:
+        """Prompt combining the user query with the preloaded data context"""
+        return f"""
         You are a Jharkhand hotel booking assistant. 
         User query: "{query}"
         
         Available hotels data:
-        {hotel_context}
+        {self.data_json}
         
         Provide hotel suggestions in EXACTLY this format (MAX 100 words total):
         
@@ -66,50 +93,19 @@ class HotelSuggestions:
         
         Be specific with hotel names and approximate prices (₹).
         """
-        
-        try:
-            response = self.model.generate_content(prompt)
-            return self._ensure_concise(response.text)
-        except:
-            return self._create_fallback_response(query)
     
-    def _ensure_concise(self, response: str) -> str:
-        """Ensure response is under 100 words"""
-        words = response.split()
-        if len(words) > 100:
-            # Truncate and add ellipsis
-            truncated = ' '.join(words[:95]) + "... Book via MakeMyTrip/Booking.com"
-            return truncated
-        return response
+    generate_suggestions = BaseHandler.respond
+    generate_suggestions_async = BaseHandler.respond_async
     
     def _create_fallback_response(self, query: str) -> str:
         """Fallback if LLM fails"""
-        return (
-            "🏨 Jharkhand Hotels:\n\n"
-            "💎 Luxury: Radisson Blu Ranchi (₹5000+)\n"
-            "🏢 Mid: Ginger Hotels (₹2000-3000)\n"
-            "💰 Budget: OYO/Guest houses (₹800-1500)\n\n"
-            "📍 Book: MakeMyTrip, Booking.com\n"
-            "💡 Tip: Book early during festivals!"
-        )
+        return _FB_HOTELS
 
-def hotel_recommendations(user_query: str, gemini_api_key: str) -> str:
-    """Main function for hotel suggestions"""
-    if not gemini_api_key:
-        return "Hotel search needs API configuration. Please contact support."
-    
-    try:
-        hotel_guide = HotelSuggestions(gemini_api_key)
-        return hotel_guide.generate_suggestions(user_query)
-    except Exception as e:
-        return (
-            "🏨 Popular Jharkhand stays:\n"
-            "Ranchi: Radisson Blu, Capitol Hill\n"
-            "Jamshedpur: The Sonnet, Ramada\n"
-            "Netarhat: Forest Rest House\n"
-            "Book via MakeMyTrip or call hotels directly!"
-        )
-    
+_ENTRY = HandlerEntry(HotelSuggestions, _CANONICAL, _NO_KEY_REPLY, _ERROR_REPLY)
+
+hotel_recommendations_stream = _ENTRY.stream
+hotel_recommendations = _ENTRY.reply
+hotel_recommendations_batch = _ENTRY.batch
 
 # from dotenv import load_dotenv
 # load_dotenv()
@@ -1,26 +1,25 @@
 import json
+import re
 import os
 from typing import Dict, List, Optional
 from datetime import datetime
-import google.generativeai as genai
-from pathlib import Path
+from llm_client import get_model
+from ._base import FallbackReply, data_path
+
+_JSON_BLOB_RE = re.compile(r'\{.*\}', re.DOTALL)
+_DURATION_RE = re.compile(r'(\d+)\s*day')
+
+_DATA_PATH = data_path('places.json')
 
 class TripPlanner:
     def __init__(self, gemini_api_key: str):
-        genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.model = get_model('gemini-2.0-flash', gemini_api_key)
         self.load_places_data()
         
     def load_places_data(self):
         """Load places data with error handling"""
         try:
-            # Handle different possible paths
-            data_path = Path(__file__).parent.parent / 'data' / 'places.json'
-            if not data_path.exists():
-                # Try alternative path
-                data_path = Path('data/places.json')
-            
-            with open(data_path, 'r', encoding='utf-8') as f:
+            with open(_DATA_PATH, 'r', encoding='utf-8') as f:
                 self.places_data = json.load(f)
         except FileNotFoundError:
             print(f"Warning: places.json not found. Using default data.")
@@ -113,8 +112,6 @@ class TripPlanner:
     
     def _parse_parameters(self, gemini_response: str) -> Dict:
         """Parse Gemini response with better error handling"""
-        import re
-        
         # Default parameters
         params = {
             "duration_days": 3,
@@ -127,7 +124,7 @@ class TripPlanner:
         
         try:
             # Try to extract JSON from response
-            json_match = re.search(r'\{.*\}', gemini_response, re.DOTALL)
+            json_match = _JSON_BLOB_RE.search(gemini_response)
             if json_match:
                 extracted_params = json.loads(json_match.group())
                 # Update params with extracted values
@@ -139,7 +136,7 @@ class TripPlanner:
             text_lower = gemini_response.lower()
             
             # Extract duration
-            duration_match = re.search(r'(\d+)\s*day', text_lower)
+            duration_match = _DURATION_RE.search(text_lower)
             if duration_match:
                 params["duration_days"] = int(duration_match.group(1))
             
@@ -224,7 +221,7 @@ At the end, add:
             response = self.model.generate_content(itinerary_prompt)
             return self._format_final_itinerary(response.text, parameters)
         except Exception as e:
-            return self._create_fallback_itinerary(duration, selected_places)
+            return FallbackReply(self._create_fallback_itinerary(duration, selected_places))
     
     def _select_places(self, interests: List[str], duration: int) -> List[Dict]:
         """Improved place selection logic"""
@@ -367,6 +364,6 @@ def plan_trip(user_query: str, gemini_api_key: str) -> str:
     except Exception as e:
         # error_message = (
         #     "I'd love to help you plan your Jharkhand adventure! 
-        return f"I'd love to help you plan your Jharkhand trip! However, I encountered an issue: {str(e)}. Could you please rephrase your request? For example: 'Plan a 3-day trip to Jharkhand for nature lovers' or 'Create a weekend itinerary for religious sites in Jharkhand'."
+        return FallbackReply(f"I'd love to help you plan your Jharkhand trip! However, I encountered an issue: {str(e)}. Could you please rephrase your request? For example: 'Plan a 3-day trip to Jharkhand for nature lovers' or 'Create a weekend itinerary for religious sites in Jharkhand'.")
     
   
\ No newline at end of file
@@ -1,23 +1,30 @@
 import json
+import re
 import os
 from typing import Dict, Optional, List
-from pathlib import Path
-import google.generativeai as genai
+from llm_client import get_model
+from ._base import FallbackReply, data_path
+
+_JSON_BLOB_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+_DATA_PATH = data_path('routes.json')
 
 class RouteHelper:
+    MODEL_NAME = 'gemini-2.5-pro'
+    
     def __init__(self, gemini_api_key: str):
-        genai.configure(api_key=gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-pro')
+        self.model = get_model(self.MODEL_NAME, gemini_api_key)
         self.load_route_data()
+    
+    @classmethod
+    def warm_up(cls, gemini_api_key: str):
+        """Create and warm the route model ahead of the first request"""
+        get_model(cls.MODEL_NAME, gemini_api_key, warm=True)
         
     def load_route_data(self):
         """Load transportation and route data"""
         try:
-            data_path = Path(__file__).parent.parent / 'data' / 'routes.json'
-            if not data_path.exists():
-                data_path = Path('data/routes.json')
-            
-            with open(data_path, 'r', encoding='utf-8') as f:
+            with open(_DATA_PATH, 'r', encoding='utf-8') as f:
                 self.route_data = json.load(f)
         except:
             self.route_data = self._get_default_route_data()
@@ -107,8 +114,6 @@ class RouteHelper:
     
     def _parse_route_context(self, response_text: str) -> Dict:
         """Parse LLM response for route context"""
-        import re
-        
         context = {
             "origin": None,
             "destination": None,
@@ -120,7 +125,7 @@ class RouteHelper:
         }
         
         try:
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            json_match = _JSON_BLOB_RE.search(response_text)
             if json_match:
                 extracted = json.loads(json_match.group())
                 for key, value in extracted.items():
@@ -159,7 +164,9 @@ class RouteHelper:
             - Landmarks: {', '.join(specific_route.get('landmarks', []))}
             """
         
-        transport_details = json.dumps(self.route_data.get("transport_info", {}), indent=2)
+        transport_details = json.dumps(
+            self.route_data.get("transport_info", {}), separators=(',', ':'), ensure_ascii=False
+        )
         
         # Create comprehensive prompt
         route_prompt = f"""
@@ -203,7 +210,7 @@ class RouteHelper:
             response = self.model.generate_content(route_prompt)
             return self._format_route_response(response.text, context)
         except Exception as e:
-            return self._create_fallback_route(context)
+            return FallbackReply(self._create_fallback_route(context))
     
     def _format_route_response(self, llm_response: str, context: Dict) -> str:
         """Add consistent formatting and emergency info"""
@@ -299,7 +306,7 @@ def route_directions(user_query: str, gemini_api_key: str) -> str:
         return route_guidance
         
     except Exception as e:
-        return (
+        return FallbackReply(
             "🗺️ I'd be happy to help with directions! Please try asking:\n"
             "• 'How to reach Hundru Falls from Ranchi?'\n"
             "• 'Transportation from Jamshedpur to Deoghar'\n"
@@ -1,67 +1,81 @@
 import os
 import re
 import json
-import google.generativeai as genai
 from typing import Tuple, Optional
 from dotenv import load_dotenv
+from intents_local import (
+    CONFIDENCE_THRESHOLD, find_non_jharkhand, mentions_jharkhand, mentions_non_jharkhand,
+    predict_intent, unknown_words,
+)
+from gemini_batcher import GeminiBatcher
+from llm_client import get_model
 
 load_dotenv()
 
-# Initialize Gemini
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-model = genai.GenerativeModel('gemini-2.5-pro')
+# Sent once as the classifier model's system instruction, not with every query
+CLASSIFIER_PROMPT = (
+    "Classify the query for a Jharkhand (India) tourism chatbot into one label: "
+    "TRIP_PLANNER, AREA_SUGGEST, ROUTE_HELPER, HOTEL_SUGGEST, HELPLINE, FESTIVALS, RAG_FAQ, "
+    "or OUT_OF_DOMAIN (about a place outside Jharkhand). Respond with only the label."
+)
 
-def classify_intent(text: str) -> str:
+VALID_INTENTS = frozenset({
+    "TRIP_PLANNER", "AREA_SUGGEST", "ROUTE_HELPER",
+    "HOTEL_SUGGEST", "HELPLINE", "FESTIVALS",
+    "RAG_FAQ", "OUT_OF_DOMAIN"
+})
+
+# Initialize Gemini; an 8-way label needs Flash, not Pro
+classifier_model = get_model('gemini-2.5-flash', os.getenv("GOOGLE_API_KEY"), system_instruction=CLASSIFIER_PROMPT)
+# Concurrent classification prompts are coalesced per 20 ms window
+classifier_batcher = GeminiBatcher(classifier_model)
+
+async def warm_up():
+    """Open the classifier's async channel, which the batcher uses, ahead of the first query"""
+    try:
+        await classifier_model.count_tokens_async("warmup")
+    except Exception:
+        pass
+
+def _keyword_re(keywords):
+    """Single-pass matcher for a keyword group; anchored at word starts so plurals still match"""
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + ")")
+
+_TRIP_RE = _keyword_re(["plan", "itinerary", "trip", "tour", "days"])
+_AREA_RE = _keyword_re(["near", "nearby", "around", "close"])
+_ROUTE_RE = _keyword_re(["reach", "route", "distance", "how to get"])
+_HOTEL_RE = _keyword_re(["hotel", "stay", "accommodation"])
+_HELPLINE_RE = _keyword_re(["helpline", "emergency", "contact"])
+_FESTIVAL_RE = _keyword_re(["festival", "event", "mela"])
+
+async def classify_intent(text: str) -> str:
     """
     LLM-based intent classification with domain validation
     Returns intent or 'OUT_OF_DOMAIN' if not Jharkhand-related
     """
     
-    prompt = f"""
-    You are an intent classifier for a Jharkhand tourism chatbot.
-    
-    CRITICAL RULES:
-    1. This chatbot ONLY handles queries about Jharkhand state, India
-    2. If the query is about any location OUTSIDE Jharkhand, return "OUT_OF_DOMAIN"
-    3. If the query mentions non-Jharkhand places (like Paris, Mumbai, Delhi, Goa, etc.), return "OUT_OF_DOMAIN"
-    
-    For VALID Jharkhand queries, classify into one of these intents:
-    - TRIP_PLANNER: Planning trips, itineraries, tour suggestions within Jharkhand
-    - AREA_SUGGEST: Nearby places, attractions around a location in Jharkhand
-    - ROUTE_HELPER: Directions, how to reach, transportation within/to Jharkhand
-    - HOTEL_SUGGEST: Accommodation, hotels, stays in Jharkhand
-    - HELPLINE: Emergency numbers, helplines for Jharkhand tourism
-    - FESTIVALS: Events, festivals, cultural programs in Jharkhand
-    - RAG_FAQ: General questions about Jharkhand tourism
-    
-    Query: "{text}"
-    
-    Analyze carefully:
-    1. Does this query relate to Jharkhand? (cities like Ranchi, Jamshedpur, Deoghar, places like Betla, Netarhat, etc.)
-    2. If location is not mentioned, could it be asking about Jharkhand tourism?
-    3. If it mentions any non-Jharkhand location explicitly, it's OUT_OF_DOMAIN
+    # Local TF-IDF classifier first; Gemini for low-confidence or possibly
+    # out-of-domain queries. A word the classifier has never seen may be a
+    # place outside Jharkhand, so it is only trusted when a Jharkhand place is named.
+    try:
+        intent, confidence = predict_intent(text)
+        if (
+            confidence >= CONFIDENCE_THRESHOLD
+            and not mentions_non_jharkhand(text)
+            and (mentions_jharkhand(text) or not unknown_words(text))
+        ):
+            return intent
+    except Exception as e:
+        print(f"Local classification failed: {e}")
     
-    Return ONLY the intent label, nothing else.
-    Examples:
-    - "Plan a trip to Paris" → OUT_OF_DOMAIN
-    - "Plan a trip to Ranchi" → TRIP_PLANNER
-    - "Hotels in Mumbai" → OUT_OF_DOMAIN
-    - "Hotels in Jamshedpur" → HOTEL_SUGGEST
-    - "Weekend trip" → TRIP_PLANNER (assumes Jharkhand context)
-    """
+    prompt = f"Query: {text}"
     
     try:
-        response = model.generate_content(prompt)
-        intent = response.text.strip().upper()
+        response_text = await classifier_batcher.submit(prompt)
+        intent = response_text.strip().upper()
         
         # Validate the response
-        valid_intents = [
-            "TRIP_PLANNER", "AREA_SUGGEST", "ROUTE_HELPER", 
-            "HOTEL_SUGGEST", "HELPLINE", "FESTIVALS", 
-            "RAG_FAQ", "OUT_OF_DOMAIN"
-        ]
-        
-        if intent in valid_intents:
+        if intent in VALID_INTENTS:
             return intent
         else:
             # Fallback to keyword-based classification
@@ -79,70 +93,46 @@ def _fallback_classification(text: str) -> str:
     t = text.lower()
     
     # Check for obvious non-Jharkhand locations
-    non_jharkhand = [
-        "paris", "london", "new york", "mumbai", "delhi", 
-        "bangalore", "chennai", "goa", "kerala", "kashmir"
-    ]
-    if any(place in t for place in non_jharkhand):
+    if mentions_non_jharkhand(t):
         return "OUT_OF_DOMAIN"
     
     # Check for Jharkhand locations
-    jharkhand_places = [
-        "ranchi", "jamshedpur", "deoghar", "dhanbad", "bokaro",
-        "netarhat", "betla", "hundru", "jonha", "jharkhand"
-    ]
-    has_jharkhand = any(place in t for place in jharkhand_places)
+    has_jharkhand = mentions_jharkhand(t)
     
     # Intent patterns
-    if any(k in t for k in ["plan", "itinerary", "trip", "tour", "days"]):
-        return "TRIP_PLANNER" if has_jharkhand or not any(place in t for place in non_jharkhand) else "OUT_OF_DOMAIN"
+    if _TRIP_RE.search(t):
+        return "TRIP_PLANNER"
     
-    if any(k in t for k in ["near", "nearby", "around", "close"]):
+    if _AREA_RE.search(t):
         return "AREA_SUGGEST" if has_jharkhand else "OUT_OF_DOMAIN"
     
-    if any(k in t for k in ["reach", "route", "distance", "how to get"]):
+    if _ROUTE_RE.search(t):
         return "ROUTE_HELPER" if has_jharkhand else "OUT_OF_DOMAIN"
     
-    if any(k in t for k in ["hotel", "stay", "accommodation"]):
+    if _HOTEL_RE.search(t):
         return "HOTEL_SUGGEST" if has_jharkhand else "OUT_OF_DOMAIN"
     
-    if any(k in t for k in ["helpline", "emergency", "contact"]):
+    if _HELPLINE_RE.search(t):
         return "HELPLINE"
     
-    if any(k in t for k in ["festival", "event", "mela"]):
+    if _FESTIVAL_RE.search(t):
         return "FESTIVALS" if has_jharkhand else "OUT_OF_DOMAIN"
     
-    # Default: if no specific location mentioned, assume Jharkhand context
-    if not any(place in t for place in non_jharkhand):
-        return "RAG_FAQ"
-    
-    return "OUT_OF_DOMAIN"
+    # Default: no non-Jharkhand location mentioned, assume Jharkhand context
+    return "RAG_FAQ"
 
 def get_out_of_domain_response(query: str) -> str:
     """
-    Generate helpful response for out-of-domain queries
+    Templated reply for out-of-domain queries, naming the place when one is recognised
     """
-    prompt = f"""
-    The user asked about something outside Jharkhand: "{query}"
-    
-    Generate a polite, helpful response that:
-    1. Acknowledges their query
-    2. Explains you only handle Jharkhand tourism
-    3. Suggests similar things they can explore in Jharkhand
-    
-    Keep it friendly and under 100 words.
-    
-    Example: If they ask about "beaches in Goa", you might suggest "waterfalls in Jharkhand"
-    """
-    
-    try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
-    except:
-        # Fallback response
-        return (
-            "I specialize in Jharkhand tourism and can only help with destinations within Jharkhand. "
-            "However, Jharkhand has amazing attractions like Hundru Falls, Betla National Park, "
-            "and the spiritual city of Deoghar. Would you like to explore these instead?"
-        )
-
+    place = find_non_jharkhand(query)
+    opener = (
+        f"I can't help with {place.title()}, as I specialize in Jharkhand tourism"
+        if place else
+        "I specialize in Jharkhand tourism"
+    )
+    return (
+        f"{opener} and can only help with destinations within Jharkhand. "
+        "However, Jharkhand has amazing attractions like Hundru Falls, Betla National Park, "
+        "and the spiritual city of Deoghar. Would you like to explore these instead?"
+    )
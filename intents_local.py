@@ -0,0 +1,177 @@
+import re
+import hashlib
+import itertools
+from functools import cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import joblib
+from sklearn.pipeline import Pipeline
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+MODEL_PATH = Path(__file__).parent / 'intent_clf.joblib'
+
+# Below this probability the caller should ask the LLM instead
+CONFIDENCE_THRESHOLD = 0.6
+
+JHARKHAND_PLACES = [
+    "ranchi", "jamshedpur", "deoghar", "dhanbad", "bokaro",
+    "netarhat", "betla", "hundru", "jonha", "jharkhand"
+]
+NON_JHARKHAND_PLACES = [
+    "paris", "london", "new york", "mumbai", "delhi",
+    "bangalore", "chennai", "goa", "kerala", "kashmir"
+]
+
+# Out-of-domain training places deliberately left out of NON_JHARKHAND_PLACES,
+# so "plan a trip to X" is learned as out of domain for places the regex never sees
+_OOD_TRAINING_PLACES = [
+    "kolkata", "gangtok", "darjeeling", "varanasi", "dubai", "shimla", "manali",
+    "jaipur", "patna", "puri", "ooty", "singapore", "bali", "hyderabad", "agra",
+]
+
+# TfidfVectorizer's default token pattern, for checking words against its vocabulary
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+# One alternation per list, so each is a single pass over the text;
+# word boundaries keep "goal" from matching "goa"
+_JHARKHAND_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, JHARKHAND_PLACES)) + r")\b")
+_NON_JHARKHAND_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, NON_JHARKHAND_PLACES)) + r")\b")
+
+# Training prompts per intent; {place}/{other} are filled with place names
+_TEMPLATES = {
+    "TRIP_PLANNER": [
+        "plan a trip to {place}", "plan a 3 day trip to {place}", "itinerary for {place}",
+        "2 days itinerary in {place}", "weekend trip from {place}", "tour plan for {place}",
+        "plan my vacation in {place}", "suggest a tour package for {place}",
+        "how many days are enough for {place}", "weekend trip", "plan a family trip",
+    ],
+    "AREA_SUGGEST": [
+        "places near {place}", "what can i see around {place}", "nearby attractions in {place}",
+        "things to do near {place}", "tourist spots close to {place}", "i am in {place} what is nearby",
+        "places to visit around {place}", "sightseeing near {place}",
+    ],
+    "ROUTE_HELPER": [
+        "how to reach {place}", "route from {place} to {other}", "distance between {place} and {other}",
+        "how do i get to {place} from {other}", "bus from {place} to {other}", "train to {place}",
+        "how far is {place} from {other}", "directions to {place}", "best way to travel to {place}",
+    ],
+    "HOTEL_SUGGEST": [
+        "hotels in {place}", "where to stay in {place}", "budget accommodation in {place}",
+        "resorts near {place}", "cheap lodge in {place}", "best hotel in {place}",
+        "homestay in {place}", "book a room in {place}", "guest house near {place}",
+    ],
+    "HELPLINE": [
+        "emergency numbers", "police helpline", "ambulance number in {place}", "tourist helpline",
+        "contact number for forest department", "emergency contact in {place}",
+        "women helpline number", "medical emergency contacts", "hospital emergency number in {place}",
+    ],
+    "FESTIVALS": [
+        "festivals in {place}", "when is sarhul", "karma festival", "upcoming events in {place}",
+        "mela in {place}", "chhath puja dates", "cultural programs in {place}",
+        "tribal festivals of jharkhand", "what festival is this month", "tusu festival",
+    ],
+    "RAG_FAQ": [
+        "tell me about {place}", "history of {place}", "what is {place} famous for",
+        "best time to visit {place}", "food of jharkhand", "tribal culture of jharkhand",
+        "wildlife in jharkhand", "is {place} safe for tourists", "what is special about {place}",
+        "famous waterfalls", "local cuisine to try",
+    ],
+    "OUT_OF_DOMAIN": [
+        "hotels in {other}", "plan a trip to {other}", "places near {other}",
+        "how to reach {other}", "festivals in {other}", "what is the capital of france",
+        "write me a poem", "stock price of apple", "python code for sorting",
+        "who won the cricket match", "beaches in {other}",
+        "where to stay in {other}", "itinerary for {other}", "3 day trip to {other}",
+        "tourist spots in {other}", "tell me a joke", "what is the weather today",
+        "translate this to hindi", "recommend a movie", "solve this math problem",
+    ],
+}
+
+
+def _training_data() -> Tuple[List[str], List[str]]:
+    """Expand the templates over the place lists into (texts, labels)"""
+    texts, labels = [], []
+    for intent, templates in _TEMPLATES.items():
+        if intent == "OUT_OF_DOMAIN":
+            pairs = zip(itertools.cycle(JHARKHAND_PLACES), NON_JHARKHAND_PLACES + _OOD_TRAINING_PLACES)
+        else:
+            pairs = zip(JHARKHAND_PLACES, JHARKHAND_PLACES[1:] + JHARKHAND_PLACES[:1])
+        pairs = list(pairs)
+        for template in templates:
+            for place, other in pairs if "{" in template else pairs[:1]:
+                texts.append(template.format(place=place, other=other))
+                labels.append(intent)
+    return texts, labels
+
+
+def _training_digest(texts: List[str], labels: List[str]) -> str:
+    return hashlib.sha256("\0".join(texts + labels).encode()).hexdigest()
+
+
+def train() -> Pipeline:
+    """Fit the TF-IDF + logistic regression classifier and save it next to this file"""
+    classifier = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)),
+        ("clf", LogisticRegression(C=10, max_iter=1000)),
+    ])
+    texts, labels = _training_data()
+    classifier.fit(texts, labels)
+    # Lets load_classifier spot a saved model trained on older templates
+    classifier.training_digest = _training_digest(texts, labels)
+    try:
+        joblib.dump(classifier, MODEL_PATH)
+    except OSError as e:
+        # Read-only deploys still work; they just retrain (~30 ms) per process
+        print(f"Could not save intent classifier: {e}")
+    return classifier
+
+
+@cache
+def load_classifier() -> Pipeline:
+    """Load the saved classifier, training it on first use, if the file is unreadable or stale"""
+    try:
+        classifier = joblib.load(MODEL_PATH)
+    except Exception:
+        return train()
+    if getattr(classifier, "training_digest", None) != _training_digest(*_training_data()):
+        return train()
+    return classifier
+
+
+def predict_intent(text: str) -> Tuple[str, float]:
+    """Return the most likely intent and its probability"""
+    classifier = load_classifier()
+    probabilities = classifier.predict_proba([text.lower()])[0]
+    best = probabilities.argmax()
+    return str(classifier.classes_[best]), float(probabilities[best])
+
+
+def unknown_words(text: str) -> List[str]:
+    """Words the classifier never saw in training, e.g. an unlisted place name
+
+    TF-IDF silently drops them, so "plan a trip to kolkata" would otherwise
+    be scored exactly like "plan a trip to".
+    """
+    vocabulary = load_classifier().named_steps["tfidf"].vocabulary_
+    return [word for word in _TOKEN_RE.findall(text.lower()) if word not in vocabulary]
+
+
+def mentions_jharkhand(text: str) -> bool:
+    return _JHARKHAND_RE.search(text.lower()) is not None
+
+
+def mentions_non_jharkhand(text: str) -> bool:
+    return _NON_JHARKHAND_RE.search(text.lower()) is not None
+
+
+def find_non_jharkhand(text: str) -> Optional[str]:
+    """First non-Jharkhand place named in the text, if any"""
+    match = _NON_JHARKHAND_RE.search(text.lower())
+    return match.group() if match else None
+
+
+if __name__ == "__main__":
+    train()
+    print(f"Saved intent classifier to {MODEL_PATH}")
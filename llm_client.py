@@ -0,0 +1,55 @@
+import os
+import threading
+from functools import cache
+from typing import Any, Dict, Optional, Tuple
+
+# The SDK's client is process-global: configure() swaps it for every model.
+# Keeping all configuration here means it only happens when the key changes,
+# and one GenerativeModel per name shares the client's pooled HTTP/2 channel.
+_MODELS: Dict[Tuple[str, str, Optional[str]], Any] = {}
+_LOCK = threading.Lock()
+_configured_key: Optional[str] = None
+
+
+@cache
+def load_genai():
+    """Import google.generativeai on first use; it pulls in grpc and protobuf"""
+    import google.generativeai as genai
+    return genai
+
+
+def configure(api_key: Optional[str] = None):
+    """Point the SDK at an API key, skipping the call if it is already configured"""
+    global _configured_key
+    api_key = api_key or os.getenv("GOOGLE_API_KEY")
+    with _LOCK:
+        if api_key != _configured_key:
+            load_genai().configure(api_key=api_key)
+            _configured_key = api_key
+    return api_key
+
+
+def get_model(
+    model_name: str,
+    api_key: Optional[str] = None,
+    warm: bool = False,
+    system_instruction: Optional[str] = None,
+):
+    """Return the shared GenerativeModel for this model name, key and system instruction
+
+    With warm=True a newly created model makes one cheap count_tokens call so
+    the channel (TLS + auth) is open before the first real query.
+    """
+    api_key = configure(api_key)
+    key = (api_key, model_name, system_instruction)
+    with _LOCK:
+        model = _MODELS.get(key)
+        if model is not None:
+            return model
+        model = _MODELS[key] = load_genai().GenerativeModel(model_name, system_instruction=system_instruction)
+    if warm:
+        try:
+            model.count_tokens("warmup")
+        except Exception:
+            pass
+    return model
@@ -1,34 +1,180 @@
 import os
+import sys
+from dotenv import load_dotenv
+
+# Read .env once at import; requests use GEMINI_KEY instead of touching the environment
+load_dotenv()
+GEMINI_KEY = os.getenv("GOOGLE_API_KEY")
+
+github_url = "https://raw.githubusercontent.com/akanupam/my_datasets/main/Jharkhand%20tourism.pdf"
+PDF_PATH = "temp_github_file.pdf"
+PDF_ETAG_PATH = PDF_PATH + ".etag"
+CHROMA_DIR = "./chroma_jh"
+# Stay under Chroma's per-call insert limit
+CHROMA_ADD_BATCH = 4096
+# Read path: unit-length chunk vectors plus one JSON line per chunk, in the same order
+EMB_PATH = "emb.npy"
+DOCS_PATH = "docs.jsonl"
+RETRIEVE_K = 4
+
+REINDEX = __name__ == "__main__" and "--reindex" in sys.argv
+if __name__ == "__main__" and not REINDEX:
+    # Hand over to uvicorn before any of the setup below runs: it imports
+    # "server" afresh in each worker, so loading the embedder, Chroma and the
+    # models here as well would only leave an unused copy in this process.
+    # Multiple workers need the import string; each worker loads its own models
+    # and caches. loop="auto" picks uvloop where uvicorn[standard] installs it.
+    if not (os.path.exists(EMB_PATH) and os.path.exists(DOCS_PATH)):
+        # Index once, in a child process, before any worker starts; workers
+        # never build it themselves (they would reset each other's collection)
+        import subprocess
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--reindex"], check=True)
+    import uvicorn
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        loop="auto",
+    )
+    sys.exit(0)
+
+import json
+import re
+import asyncio
 import requests
+import numpy as np
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_huggingface import HuggingFaceEmbeddings
+from embedder import MiniLMEmbeddings
 from langchain_chroma import Chroma
 from langchain import hub
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import Callable, Dict, Iterator, List, Optional
+from contextlib import asynccontextmanager
 
-github_url = "https://raw.githubusercontent.com/akanupam/my_datasets/main/Jharkhand%20tourism.pdf"
-response = requests.get(github_url)
-
-# Save the PDF content to a temporary local file
-with open("temp_github_file.pdf", "wb") as f:
-    f.write(response.content)
-
-# Load the PDF from the temporary local file
-loader = PyPDFLoader(file_path="temp_github_file.pdf")
-docs = loader.load()
-
-
+# Paragraph-sized chunks: fewer vectors to embed and search, more context per hit
 text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=300,
-    chunk_overlap=20,
+    chunk_size=1000,
+    chunk_overlap=150,
+    separators=["\n\n", "\n", ". ", " ", ""],
 )
-texts = text_splitter.split_documents(docs)
 
 
-vectorstore = Chroma.from_documents( texts,HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2"))
-retriever = vectorstore.as_retriever()
+def download_pdf() -> str:
+    """Fetch the tourism PDF, skipping the body when the server reports it unchanged"""
+    headers = {}
+    if os.path.exists(PDF_PATH) and os.path.exists(PDF_ETAG_PATH):
+        with open(PDF_ETAG_PATH) as f:
+            headers["If-None-Match"] = f.read().strip()
+
+    try:
+        response = requests.get(github_url, headers=headers, timeout=60)
+        response.raise_for_status()
+    except requests.RequestException:
+        # The repo ships a copy of the PDF, so indexing still works offline
+        if os.path.exists(PDF_PATH):
+            return PDF_PATH
+        raise
+    if response.status_code == 304:
+        return PDF_PATH
+
+    # Save the PDF content to a temporary local file
+    with open(PDF_PATH, "wb") as f:
+        f.write(response.content)
+    if response.headers.get("ETag"):
+        with open(PDF_ETAG_PATH, "w") as f:
+            f.write(response.headers["ETag"])
+    return PDF_PATH
+
+
+def build_index(store) -> int:
+    """(Re)build the persisted collection from the PDF; returns the number of chunks"""
+    # Load the PDF from the temporary local file
+    loader = PyPDFLoader(file_path=download_pdf())
+    texts = text_splitter.split_documents(loader.load())
+    contents = [doc.page_content for doc in texts]
+
+    # Embed every chunk in one batched pass, then hand Chroma ready-made vectors
+    vectors = embeddings.encode(contents)
+    store.reset_collection()
+    for start in range(0, len(texts), CHROMA_ADD_BATCH):
+        end = start + CHROMA_ADD_BATCH
+        store._collection.add(
+            ids=[f"chunk-{i}" for i in range(start, min(end, len(texts)))],
+            documents=contents[start:end],
+            metadatas=[doc.metadata for doc in texts[start:end]],
+            embeddings=vectors[start:end],
+        )
+
+    # Written to per-process temp names and renamed into place, docs first:
+    # the vectors file is what marks the snapshot as usable
+    suffix = f".{os.getpid()}.tmp"
+    with open(DOCS_PATH + suffix, "w", encoding="utf-8") as f:
+        for doc in texts:
+            f.write(json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False) + "\n")
+    os.replace(DOCS_PATH + suffix, DOCS_PATH)
+    with open(EMB_PATH + suffix, "wb") as f:
+        np.save(f, np.ascontiguousarray(vectors, dtype=np.float32))
+    os.replace(EMB_PATH + suffix, EMB_PATH)
+    return len(texts)
+
+
+def load_snapshot():
+    """Memory-map the saved chunk vectors and load their documents, or (None, None)
+
+    The vectors stay on disk; every worker maps the same pages from the OS
+    cache instead of holding its own copy.
+    """
+    if not (os.path.exists(EMB_PATH) and os.path.exists(DOCS_PATH)):
+        return None, None
+    vecs = np.load(EMB_PATH, mmap_mode="r")
+    with open(DOCS_PATH, encoding="utf-8") as f:
+        docs = [Document(**json.loads(line)) for line in f]
+    if len(docs) != vecs.shape[0]:
+        print(f"{EMB_PATH} and {DOCS_PATH} disagree; retrieving through Chroma")
+        return None, None
+    return vecs, docs
+
+
+# One MiniLM instance shared by the vector store and the semantic reply cache
+embeddings = MiniLMEmbeddings("all-MiniLM-L6-v2")
+# Chroma writes through to CHROMA_DIR, so later boots reuse the embedded chunks
+vectorstore = Chroma(
+    collection_name="jharkhand_tourism",
+    persist_directory=CHROMA_DIR,
+    embedding_function=embeddings,
+    # HNSW is fixed at collection creation; reset_collection() reapplies this
+    collection_metadata={
+        "hnsw:space": "cosine",
+        "hnsw:M": 32,
+        "hnsw:construction_ef": 200,
+        "hnsw:search_ef": 64,
+    },
+)
+if REINDEX:
+    print(f"Indexed {build_index(vectorstore)} chunks into {CHROMA_DIR}")
+    # A build step: stop before the prompt hub, Gemini and the web app are set up
+    sys.exit(0)
+chunk_vectors, chunk_docs = load_snapshot()
+if chunk_vectors is None and vectorstore._collection.count() == 0:
+    # Every worker imports this module, so indexing here would race
+    raise RuntimeError(f"No search index in {CHROMA_DIR}; run `python server.py --reindex` first")
+# Only used when there is no snapshot (e.g. an index built before snapshots existed)
+retriever = vectorstore.as_retriever(search_kwargs={"k": RETRIEVE_K})
+
+
+def search_chunks(query: str, k: int = RETRIEVE_K) -> List[Document]:
+    """Top-k chunks by cosine similarity, scored straight off the memory-mapped vectors"""
+    if chunk_vectors is None:
+        return retriever.invoke(query)
+    scores = chunk_vectors @ embeddings.embed_query_array(query)
+    k = min(k, len(scores))
+    if k == 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    return [chunk_docs[i] for i in top[np.argsort(-scores[top])]]
 
 prompt = hub.pull("rlm/rag-prompt")
 
@@ -36,14 +182,12 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 
 
 # Make sure you have set the environment variable
-from dotenv import load_dotenv
-load_dotenv()
-if not os.getenv("GOOGLE_API_KEY"):
+if not GEMINI_KEY:
     raise ValueError("Please set the GOOGLE_API_KEY environment variable")
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.0-flash",
     temperature=0.7,
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
+    google_api_key=GEMINI_KEY,
     convert_system_message_to_human=True
 )
 
@@ -51,8 +195,8 @@ llm = ChatGoogleGenerativeAI(
 def format_docs(docs):
   return "\n".join(doc.page_content for doc in docs)
 
-rag_chain= ({"context": retriever| format_docs, "question": RunnablePassthrough()}
-            |prompt
+# Retrieval happens separately (see _retrieve) so it can overlap intent classification
+rag_chain= (prompt
             |llm
             |StrOutputParser())
 
@@ -65,23 +209,165 @@ rag_chain= ({"context": retriever| format_docs, "question": RunnablePassthrough(
 
 
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
-import uvicorn
-import nest_asyncio
+from handlers._base import FallbackReply, IncompleteReply, named_places
 from handlers.planner import plan_trip
-from handlers.area import nearby_suggestions
-from handlers.route import route_directions
-from handlers.hotels import hotel_recommendations
-from handlers.helplines import get_helpline
-from handlers.festivals import festival_info
-from intents import classify_intent, get_out_of_domain_response
+from handlers.area import AreaSuggestions, nearby_suggestions_stream
+from handlers.route import RouteHelper, route_directions
+from handlers.hotels import HotelSuggestions, hotel_recommendations_stream
+from handlers.helplines import HelplineService, get_helpline_stream
+from handlers.festivals import FestivalGuide, festival_info_stream
+from intents import classify_intent, get_out_of_domain_response, warm_up as warm_up_classifier
+from chat_cache import SemanticReplyCache, TTLLRUCache, normalize_message
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Request handlers only enqueue log records; a listener thread does the stdout writes
+logger = logging.getLogger("chatbot")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue = queue.Queue(-1)
+logger.addHandler(QueueHandler(_log_queue))
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+_log_listener = QueueListener(_log_queue, _log_stream)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+
+def _log_chat(intent: str, user_msg: str):
+    logger.info(
+        "chat intent=%s msg_len=%d", intent, len(user_msg),
+        extra={"intent": intent, "msg_len": len(user_msg)},
+    )
+
+
+def answer_from_rag(query: str, docs) -> Iterator[str]:
+    return rag_chain.stream({"context": format_docs(docs), "question": query})
+
 
+async def _retrieve(query: str):
+    return await run_in_threadpool(search_chunks, query)
 
 
-def answer_from_rag(query: str) -> str:
-    return rag_chain.invoke(query)
+# normalized message -> intent, so each distinct message is classified once
+_INTENT_CACHE = TTLLRUCache(maxsize=2048, ttl=3600)
+# (intent, normalized message) -> reply, so repeat questions skip both LLM calls
+_REPLY_CACHE = TTLLRUCache(maxsize=2048, ttl=3600)
+# Paraphrases of earlier questions ("where to stay in Ranchi" / "hotels in Ranchi")
+_SEMANTIC_CACHE = SemanticReplyCache(embeddings.embed_query_array, threshold=0.95)
+
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def _semantic_scope(normalized: str) -> Optional[str]:
+    """Places and numbers in the message, in order
+
+    MiniLM mean-pools its tokens, so "ranchi to netarhat" and "netarhat to
+    ranchi", or a 2 and a 3 day trip, embed almost identically; a paraphrase
+    only counts when these agree.
+    """
+    return ",".join(named_places(normalized) + _NUMBER_RE.findall(normalized)) or None
+
+
+def _semantic_lookup(normalized: str) -> Optional[str]:
+    try:
+        return _SEMANTIC_CACHE.get(normalized, _semantic_scope(normalized))
+    except Exception:
+        # Embedding problems must never block the actual answer
+        return None
+
+
+def _is_fallback(chunks: List[str]) -> bool:
+    """True when a handler served canned text because its LLM call failed"""
+    return any(isinstance(chunk, FallbackReply) for chunk in chunks)
+
+
+def _remember_reply(intent: str, normalized: str, reply: str):
+    _REPLY_CACHE.set((intent, normalized), reply)
+    if intent == "OUT_OF_DOMAIN":
+        # Templated per place and cheap to rebuild; a paraphrase could name another place
+        return
+    try:
+        _SEMANTIC_CACHE.set(normalized, reply, _semantic_scope(normalized))
+    except Exception:
+        pass
+
+
+async def _resolve(user_msg: str):
+    """Cache lookups, intent classification and speculative retrieval for one message
+
+    Returns (normalized, intent, cached_reply, docs_task); docs_task is None
+    when a cached reply is returned, and so is intent when that reply came
+    from the semantic cache.
+    """
+    normalized = normalize_message(user_msg)
+    # Exact repeats first: both lookups are plain dict hits
+    intent = _INTENT_CACHE.get(normalized)
+    if intent is not None:
+        cached = _REPLY_CACHE.get((intent, normalized))
+        if cached is not None:
+            return normalized, intent, cached, None
+    # Checked before classification so a paraphrase skips the intent call too
+    # (embedding, Gemini and RAG calls all block, so they run on worker threads)
+    cached = await run_in_threadpool(_semantic_lookup, normalized)
+    if cached is not None:
+        return normalized, None, cached, None
+    # Speculatively retrieve RAG context while the intent is being classified;
+    # the documents are simply dropped for non-RAG intents
+    docs_task = asyncio.create_task(_retrieve(user_msg))
+    if intent is None:
+        intent = await classify_intent(normalized)
+        _INTENT_CACHE.set(normalized, intent)
+    if intent != "RAG_FAQ":
+        docs_task.cancel()
+    return normalized, intent, None, docs_task
+
+
+def _once(handler: Callable[[str, str], str]) -> Callable[..., Iterator[str]]:
+    """Adapt a handler that returns the whole reply to the streaming signature"""
+    def stream(user_msg: str, gemini_key: str, docs) -> Iterator[str]:
+        yield handler(user_msg, gemini_key)
+    return stream
+
+
+# intent -> reply stream taking (user_msg, gemini_key, docs); register new intents here
+HANDLERS: Dict[str, Callable[..., Iterator[str]]] = {
+    "RAG_FAQ": lambda user_msg, gemini_key, docs: answer_from_rag(user_msg, docs),
+    "TRIP_PLANNER": _once(plan_trip),
+    "AREA_SUGGEST": lambda user_msg, gemini_key, docs: nearby_suggestions_stream(user_msg, gemini_key),
+    "ROUTE_HELPER": _once(route_directions),
+    "HOTEL_SUGGEST": lambda user_msg, gemini_key, docs: hotel_recommendations_stream(user_msg, gemini_key),
+    "HELPLINE": lambda user_msg, gemini_key, docs: get_helpline_stream(user_msg, gemini_key),
+    "FESTIVALS": lambda user_msg, gemini_key, docs: festival_info_stream(user_msg, gemini_key),
+}
+
+
+def _unknown_intent(user_msg: str, gemini_key: str, docs) -> Iterator[str]:
+    yield FallbackReply("Sorry, I couldn't understand your request.")
+
+
+def _reply_stream(intent: str, user_msg: str, gemini_key: str, docs) -> Iterator[str]:
+    """Reply text for an in-domain intent, chunk by chunk where the handler streams"""
+    return HANDLERS.get(intent, _unknown_intent)(user_msg, gemini_key, docs)
+
+
+def _sse(text: str) -> str:
+    """One Server-Sent Event carrying a JSON-encoded text chunk (keeps newlines intact)"""
+    return f"data: {json.dumps({'text': text}, ensure_ascii=False)}\n\n"
+
+
+_SSE_DONE = "event: done\ndata: {}\n\n"
+# Sent when the model fails after part of the reply was already streamed
+_INTERRUPTED_NOTICE = "\n\n⚠️ This reply was cut off. Please ask again."
+# Sent when generation fails before anything reached the client and there is no canned reply
+_UNAVAILABLE_REPLY = FallbackReply("Sorry, I couldn't answer that right now. Please try again.")
 
 
 class ChatRequest(BaseModel):
@@ -91,7 +377,19 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     reply: str
 
-app = FastAPI()
+def warm_up_models():
+    """Open the Gemini connections at boot so the first user query skips the handshake"""
+    for handler in (AreaSuggestions, FestivalGuide, HelplineService, HotelSuggestions, RouteHelper):
+        handler.warm_up(GEMINI_KEY)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the handlers' models and the classifier's async channel before serving"""
+    await asyncio.gather(run_in_threadpool(warm_up_models), warm_up_classifier())
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -108,36 +406,79 @@ async def chat_endpoint(req: ChatRequest):
     user_msg = req.message
     if not user_msg:
         raise HTTPException(status_code=400, detail="Empty message")
-    intent = classify_intent(user_msg)
+    normalized, intent, cached, docs_task = await _resolve(user_msg)
+    if cached is not None:
+        return ChatResponse(reply=cached)
     if intent == "OUT_OF_DOMAIN":
         reply = get_out_of_domain_response(user_msg)
+        _remember_reply(intent, normalized, reply)
         return ChatResponse(reply=reply)
-    from dotenv import load_dotenv
-    load_dotenv()
-    gemini_key = os.getenv("GOOGLE_API_KEY")
-    if intent == "RAG_FAQ":
-        reply = answer_from_rag(user_msg)
-    elif intent == "TRIP_PLANNER":
-        reply = plan_trip(user_msg, gemini_key)
-    elif intent == "AREA_SUGGEST":
-        reply = nearby_suggestions(user_msg, gemini_key)
-    elif intent == "ROUTE_HELPER":
-        reply = route_directions(user_msg, gemini_key)
-    elif intent == "HOTEL_SUGGEST":
-        reply = hotel_recommendations(user_msg, gemini_key)
-    elif intent == "HELPLINE":
-        reply = get_helpline(user_msg, gemini_key)
-    elif intent == "FESTIVALS":
-        reply = festival_info(user_msg, gemini_key)
-    else:
-        # Fallback
-        reply = "Sorry, I couldn't understand your request."
-    print(f"User query: {user_msg}, Classified as: {intent}")
+    docs = await docs_task if intent == "RAG_FAQ" else None
+    try:
+        chunks = await run_in_threadpool(lambda: list(_reply_stream(intent, user_msg, GEMINI_KEY, docs)))
+    except IncompleteReply as e:
+        # Nothing was sent yet, so answer with the handler's canned reply (left uncached)
+        logger.warning("chat stream failed intent=%s", intent, exc_info=e)
+        chunks = [e.fallback]
+    except Exception:
+        # A reply cut off mid-generation is neither returned nor cached
+        raise HTTPException(status_code=502, detail="Reply generation failed")
+    reply = "".join(chunks)
+    _log_chat(intent, user_msg)
+    # A canned fallback would otherwise be served for an hour after one transient error
+    if not _is_fallback(chunks):
+        _remember_reply(intent, normalized, reply)
     return ChatResponse(reply=reply)
 
 
-
-if __name__ == "__main__":
-    nest_asyncio.apply()
-    uvicorn.run(app, host="0.0.0.0", port=8000)
-
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest):
+    """Same as /api/chat, but sends the reply as Server-Sent Events while it is generated"""
+    user_msg = req.message
+    if not user_msg:
+        raise HTTPException(status_code=400, detail="Empty message")
+    normalized, intent, cached, docs_task = await _resolve(user_msg)
+
+    async def events():
+        if cached is not None:
+            yield _sse(cached)
+        elif intent == "OUT_OF_DOMAIN":
+            reply = get_out_of_domain_response(user_msg)
+            _remember_reply(intent, normalized, reply)
+            yield _sse(reply)
+        else:
+            docs = await docs_task if intent == "RAG_FAQ" else None
+            chunks: List[str] = []
+            stream = _reply_stream(intent, user_msg, GEMINI_KEY, docs)
+            try:
+                async for chunk in iterate_in_threadpool(stream):
+                    chunks.append(chunk)
+                    yield _sse(chunk)
+            except Exception:
+                logger.exception("chat stream failed intent=%s", intent)
+                if chunks:
+                    # Part of the reply is already on the client; say it is incomplete
+                    yield _sse(_INTERRUPTED_NOTICE)
+                else:
+                    yield _sse(_UNAVAILABLE_REPLY)
+            else:
+                _log_chat(intent, user_msg)
+                # Only a fully streamed reply from the model is cached
+                if not _is_fallback(chunks):
+                    _remember_reply(intent, normalized, "".join(chunks))
+        yield _SSE_DONE
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/cache_stats")
+def cache_stats():
+    return {
+        "replies": _REPLY_CACHE.stats(),
+        "semantic": _SEMANTIC_CACHE.stats(),
+        "intents": _INTENT_CACHE.stats(),
+    }
@@ -1,4 +1,13 @@
 import math
+import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    # Listed in requirements.txt; this only keeps utils importable without it
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+@njit(cache=True, fastmath=True)
 def haversine(lat1,lon1,lat2,lon2):
     R = 6371
     phi1,phi2=math.radians(lat1),math.radians(lat2)
@@ -6,3 +15,23 @@ def haversine(lat1,lon1,lat2,lon2):
     a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*(math.sin(dl/2)**2)
     return 2*R*math.asin(math.sqrt(a))
 
+# Compile (or load the cache=True machine code) at import, not on the first request
+haversine(0.0,0.0,0.0,0.0)
+
+def haversine_vec(lat1,lon1,lats,lons):
+    """Distances in km from one point to arrays of points (degrees), in one broadcast"""
+    R = 6371
+    phi1=math.radians(lat1); phis=np.radians(lats)
+    dphi=phis-phi1; dl=np.radians(lons)-math.radians(lon1)
+    a = np.sin(dphi/2)**2 + math.cos(phi1)*np.cos(phis)*(np.sin(dl/2)**2)
+    return 2*R*np.arcsin(np.sqrt(a))
+
+def nearest_k(lat,lon,lats,lons,k):
+    """Indices and distances of the k closest points, closest first"""
+    d = haversine_vec(lat,lon,lats,lons)
+    if k < len(d):
+        idx = np.argpartition(d,k)[:k]
+    else:
+        idx = np.arange(len(d))
+    idx = idx[np.argsort(d[idx])]
+    return idx, d[idx]